@@ -0,0 +1,260 @@
+# BingXServices/TradingService/context_modulator.py
+from __future__ import annotations
+
+import logging
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .config.config_loader import AppConfig
+
+logger = logging.getLogger(__name__)
+
+# Timeframe en el que "vive" cada uno de los 13 niveles cósmicos.
+LEVEL_TIMEFRAMES: Dict[str, str] = {
+    "Ola": "1m",
+    "Marea": "1m",
+    "LuchaMareas": "1m",
+    "Corriente1m": "1m",
+    "Tierra1m": "1m",
+    "Luna5m": "5m",
+    "Sol15m": "15m",
+    "SistemaSolar1h": "1h",
+    "ViaLactea4h": "4h",
+    "GrupoLocal5m": "5m",
+    "CumuloVirgo15m": "15m",
+    "Andromeda1h": "1h",
+    "Universo4h": "4h",
+}
+
+# ADX a partir del cual se considera que hay tendencia (referencia clásica de Wilder).
+ADX_TREND_REFERENCE = 25.0
+
+# Límites de cada factor individual y del multiplicador combinado.
+FACTOR_MIN, FACTOR_MAX = 0.5, 1.5
+MULTIPLIER_MIN, MULTIPLIER_MAX = 0.25, 2.0
+
+
+def _clip(value: float, low: float, high: float) -> float:
+    return low if value < low else high if value > high else value
+
+
+class RollingContextState:
+    """
+    Estado incremental de un par (símbolo, timeframe).
+    Cada vela se procesa en O(1): suavizado de Wilder para ATR/+DM/-DM/ADX y volumen,
+    y sumas rodantes para la media de ATR normalizado y de volumen.
+    """
+    __slots__ = (
+        "window", "lookback", "bars", "count", "dx_count",
+        "prev_high", "prev_low", "prev_close",
+        "atr", "plus_dm", "minus_dm", "adx", "natr", "volume",
+        "natr_window", "natr_sum", "volume_window", "volume_sum",
+    )
+
+    def __init__(self, window: int, lookback: int):
+        self.window = window
+        self.lookback = lookback
+        self.bars = 0
+        self.count = 0
+        self.dx_count = 0
+        self.prev_high = 0.0
+        self.prev_low = 0.0
+        self.prev_close = 0.0
+        self.atr = 0.0
+        self.plus_dm = 0.0
+        self.minus_dm = 0.0
+        self.adx = 0.0
+        self.natr = 0.0
+        self.volume = 0.0
+        self.natr_window: Deque[float] = deque()
+        self.natr_sum = 0.0
+        self.volume_window: Deque[float] = deque()
+        self.volume_sum = 0.0
+
+    @property
+    def is_ready(self) -> bool:
+        return self.count >= self.window and self.dx_count >= self.window
+
+    def _push_rolling(self, values: Deque[float], total: float, value: float) -> float:
+        values.append(value)
+        total += value
+        if len(values) > self.lookback:
+            total -= values.popleft()
+        return total
+
+    def update(self, high: float, low: float, close: float, volume: float) -> None:
+        """Incorpora una vela cerrada."""
+        self.bars += 1
+        # Volumen suavizado: una vela aislada no debe hacer saltar el peso del nivel
+        self.volume += (volume - self.volume) * (1.0 / min(self.bars, self.window))
+        self.volume_sum = self._push_rolling(self.volume_window, self.volume_sum, volume)
+
+        if self.bars == 1:
+            self.prev_high, self.prev_low, self.prev_close = high, low, close
+            return
+
+        tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        up_move = high - self.prev_high
+        down_move = self.prev_low - low
+        plus_dm = up_move if up_move > down_move and up_move > 0 else 0.0
+        minus_dm = down_move if down_move > up_move and down_move > 0 else 0.0
+
+        # Durante el calentamiento alpha = 1/count (media simple); después, alpha = 1/N (Wilder).
+        self.count += 1
+        alpha = 1.0 / min(self.count, self.window)
+        self.atr += (tr - self.atr) * alpha
+        self.plus_dm += (plus_dm - self.plus_dm) * alpha
+        self.minus_dm += (minus_dm - self.minus_dm) * alpha
+
+        di_sum = self.plus_dm + self.minus_dm
+        dx = 100.0 * abs(self.plus_dm - self.minus_dm) / di_sum if di_sum > 0 else 0.0
+        self.dx_count += 1
+        self.adx += (dx - self.adx) * (1.0 / min(self.dx_count, self.window))
+
+        self.natr = self.atr / close if close > 0 else 0.0
+        self.natr_sum = self._push_rolling(self.natr_window, self.natr_sum, self.natr)
+
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+
+    def multiplier(self) -> float:
+        """Combina los factores ADX, ATR normalizado y volumen en un único peso."""
+        if not self.is_ready:
+            return 1.0
+
+        adx_factor = _clip(self.adx / ADX_TREND_REFERENCE, FACTOR_MIN, FACTOR_MAX)
+
+        # Volatilidad anómala respecto a su media reciente -> se reduce la confianza
+        mean_natr = self.natr_sum / len(self.natr_window) if self.natr_window else 0.0
+        volatility_factor = _clip(mean_natr / self.natr, FACTOR_MIN, FACTOR_MAX) if self.natr > 0 else 1.0
+
+        # Volumen por encima de su media reciente -> el movimiento tiene "combustible"
+        mean_volume = self.volume_sum / len(self.volume_window) if self.volume_window else 0.0
+        volume_factor = _clip(self.volume / mean_volume, FACTOR_MIN, FACTOR_MAX) if mean_volume > 0 else 1.0
+
+        return _clip(adx_factor * volatility_factor * volume_factor, MULTIPLIER_MIN, MULTIPLIER_MAX)
+
+
+class ContextModulator:
+    """
+    El Context Modulator de MIGUEL: ponderación DINÁMICA de la jerarquía cósmica.
+    Mantiene ADX, ATR normalizado y volumen por (símbolo, timeframe) de forma incremental
+    y expone un multiplicador por nivel cósmico que el MetricsManager aplica a sus matrices.
+    """
+    def __init__(self, app_config: "AppConfig"):
+        position_params = app_config.services.trading_service.adaptive_position_params
+        self.window: int = int(position_params.volatility_window)
+        self.lookback: int = int(position_params.volatility_lookback)
+
+        self.states: Dict[Tuple[str, str], RollingContextState] = {}
+        # Caché de multiplicadores por símbolo; se invalida al llegar una vela nueva.
+        self._level_multipliers: Dict[str, Dict[str, float]] = {}
+
+    def _get_state(self, symbol: str, timeframe: str) -> RollingContextState:
+        key = (symbol, timeframe)
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = RollingContextState(self.window, self.lookback)
+        return state
+
+    def update_bar(self, symbol: str, timeframe: str, high: float, low: float, close: float, volume: float) -> None:
+        """Actualiza el estado con una vela cerrada. Coste O(1)."""
+        self._get_state(symbol, timeframe).update(float(high), float(low), float(close), float(volume))
+        self._level_multipliers.pop(symbol, None)
+
+    def bootstrap(
+        self,
+        timeframe: str,
+        symbols: Sequence[str],
+        highs: Iterable,
+        lows: Iterable,
+        closes: Iterable,
+        volumes: Iterable,
+    ) -> None:
+        """
+        Carga inicial vectorizada entre símbolos. Las series tienen forma (n_símbolos, n_velas)
+        y deben estar alineadas en el tiempo. Replica exactamente la recursión de `update_bar`.
+        """
+        high = np.asarray(highs, dtype=float)
+        low = np.asarray(lows, dtype=float)
+        close = np.asarray(closes, dtype=float)
+        volume = np.asarray(volumes, dtype=float)
+        if close.ndim != 2 or not (high.shape == low.shape == volume.shape == close.shape) \
+                or close.shape[0] != len(symbols) or close.shape[1] == 0:
+            logger.warning(
+                f"Bootstrap del Context Modulator ignorado para {timeframe}: dimensiones inválidas "
+                f"(high={high.shape}, low={low.shape}, close={close.shape}, volume={volume.shape}, símbolos={len(symbols)})"
+            )
+            return
+        n_symbols, n_bars = close.shape
+
+        atr = np.zeros(n_symbols)
+        plus_dm = np.zeros(n_symbols)
+        minus_dm = np.zeros(n_symbols)
+        adx = np.zeros(n_symbols)
+        natr = np.zeros((n_symbols, n_bars))
+        smoothed_volume = volume[:, 0].copy()
+
+        for t in range(1, n_bars):
+            smoothed_volume += (volume[:, t] - smoothed_volume) * (1.0 / min(t + 1, self.window))
+
+            prev_close = close[:, t - 1]
+            tr = np.maximum(high[:, t] - low[:, t], np.maximum(np.abs(high[:, t] - prev_close), np.abs(low[:, t] - prev_close)))
+            up_move = high[:, t] - high[:, t - 1]
+            down_move = low[:, t - 1] - low[:, t]
+            pdm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+            mdm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+
+            alpha = 1.0 / min(t, self.window)
+            atr += (tr - atr) * alpha
+            plus_dm += (pdm - plus_dm) * alpha
+            minus_dm += (mdm - minus_dm) * alpha
+
+            di_sum = plus_dm + minus_dm
+            dx = np.divide(100.0 * np.abs(plus_dm - minus_dm), di_sum, out=np.zeros(n_symbols), where=di_sum > 0)
+            adx += (dx - adx) * alpha
+
+            np.divide(atr, close[:, t], out=natr[:, t], where=close[:, t] > 0)
+
+        natr_tail = natr[:, max(1, n_bars - self.lookback):]
+        volume_tail = volume[:, max(0, n_bars - self.lookback):]
+
+        for i, symbol in enumerate(symbols):
+            state = RollingContextState(self.window, self.lookback)
+            state.bars = n_bars
+            state.count = state.dx_count = n_bars - 1
+            state.prev_high, state.prev_low, state.prev_close = float(high[i, -1]), float(low[i, -1]), float(close[i, -1])
+            state.atr, state.plus_dm, state.minus_dm, state.adx = float(atr[i]), float(plus_dm[i]), float(minus_dm[i]), float(adx[i])
+            state.natr = float(natr[i, -1]) if n_bars > 1 else 0.0
+            state.volume = float(smoothed_volume[i])
+            state.natr_window.extend(natr_tail[i].tolist())
+            state.natr_sum = sum(state.natr_window)
+            state.volume_window.extend(volume_tail[i].tolist())
+            state.volume_sum = sum(state.volume_window)
+            self.states[(symbol, timeframe)] = state
+            self._level_multipliers.pop(symbol, None)
+
+        logger.info(f"Context Modulator inicializado para {n_symbols} símbolos en {timeframe} ({n_bars} velas).")
+
+    def get_level_multipliers(self, symbol: str) -> Dict[str, float]:
+        """Devuelve el multiplicador dinámico de cada nivel cósmico para el símbolo."""
+        cached = self._level_multipliers.get(symbol)
+        if cached is not None:
+            return cached
+
+        tf_multipliers: Dict[str, float] = {}
+        for timeframe in set(LEVEL_TIMEFRAMES.values()):
+            state: Optional[RollingContextState] = self.states.get((symbol, timeframe))
+            tf_multipliers[timeframe] = state.multiplier() if state is not None else 1.0
+
+        multipliers = {level: tf_multipliers[tf] for level, tf in LEVEL_TIMEFRAMES.items()}
+        self._level_multipliers[symbol] = multipliers
+        return multipliers
+
+__all__ = [
+    "ContextModulator",
+    "RollingContextState",
+    "LEVEL_TIMEFRAMES",
+]
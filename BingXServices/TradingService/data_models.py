@@ -3,9 +3,10 @@
 from __future__ import annotations
 
 import logging
+import weakref
 from collections import deque
 from decimal import Decimal
-from typing import Deque, Dict, List, Optional
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Type, TypeVar
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -136,6 +137,8 @@ class PartialPhaseData(BaseModel):
     symbol: str = ""
     phase_name: PartialImpulseLiteralPhasesType = ""
     active: bool = False
+    entry_ts: int = 0
+    exit_ts: int = 0
     metrics: MicroTimeframeMetrics = Field(default_factory=MicroTimeframeMetrics)
 
 class PartialImpulseData(BaseModel):
@@ -144,6 +147,8 @@ class PartialImpulseData(BaseModel):
     symbol: str = ""
     active: bool = False
     side: SideLiteralType = ""
+    entry_ts: int = 0
+    exit_ts: int = 0
     phase_history: Deque[PartialPhaseData] = Field(default_factory=lambda: deque(maxlen=20))
     metrics: MicroTimeframeMetrics = Field(default_factory=MicroTimeframeMetrics)
 
@@ -163,6 +168,8 @@ class TotalImpulseData(BaseModel):
     timeframe: TimeframeLiteralType = "1m"
     active: bool = False
     side: SideLiteralType = ""
+    entry_ts: int = 0
+    exit_ts: int = 0
     metrics: MicroTimeframeMetrics = Field(default_factory=MicroTimeframeMetrics)
     macd_cycle_history: Deque[MacdCycleData] = Field(default_factory=lambda: deque(maxlen=50))
 
@@ -173,6 +180,8 @@ class TotalTrendData(BaseModel):
     timeframe: TimeframeLiteralType = "1m"
     active: bool = False
     side: SideLiteralType = ""
+    entry_ts: int = 0
+    exit_ts: int = 0
     metrics: MacroTimeframeMetrics = Field(default_factory=MacroTimeframeMetrics)
     total_impulse_history: Deque[TotalImpulseData] = Field(default_factory=lambda: deque(maxlen=50)) # Solo para 1
 
@@ -189,6 +198,8 @@ class GlobalTotalImpulseData(BaseModel):
     timeframe: MultiTimeframeLiteralType
     active: bool = False
     side: SideLiteralType = ""
+    entry_ts: int = 0
+    exit_ts: int = 0
     metrics: MacroTimeframeMetrics = Field(default_factory=MacroTimeframeMetrics)
     total_impulse_history: Deque[TotalImpulseData] = Field(default_factory=lambda: deque(maxlen=50))
 
@@ -205,6 +216,8 @@ class GlobalTotalTrendData(BaseModel):
     timeframe: MultiTimeframeLiteralType
     active: bool = False
     side: SideLiteralType = ""
+    entry_ts: int = 0
+    exit_ts: int = 0
     metrics: MacroTimeframeMetrics = Field(default_factory=MacroTimeframeMetrics)
     global_total_impulse_history: Deque[GlobalTotalImpulseData] = Field(default_factory=lambda: deque(maxlen=50))
     total_trend_history: Deque[TotalTrendData] = Field(default_factory=lambda: deque(maxlen=50))
@@ -238,6 +251,147 @@ class TimeframeSpecificTrendData(BaseModel):
     exit_ema200: Decimal = ZERO
     impulse_history: Deque[TimeframeSpecificImpulseData] = Field(default_factory=lambda: deque(maxlen=50))
 
+# --- CONSTRUCCIÓN RÁPIDA (Hot Path) ---
+# Los períodos producidos internamente por los orquestadores ya son válidos por construcción:
+# se crean sin validación y reutilizan métricas de períodos cerrados expulsados de los deques.
+# El estado cargado desde fuera (persistencia, API) debe seguir usando el constructor normal
+# o `model_validate`, que validan todos los campos.
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+MetricsT = TypeVar("MetricsT", bound=BasePeriodMetrics)
+
+# Por clase: (defaults inmutables, [(campo, default_factory)], [(campo, clase de métricas)]).
+# Se cachea porque `model_construct` vuelve a inspeccionar cada default_factory en cada llamada.
+_TrustedLayout = Tuple[Dict[str, Any], List[Tuple[str, Callable[[], Any]]], List[Tuple[str, type]]]
+_TRUSTED_LAYOUTS: Dict[type, _TrustedLayout] = {}
+
+_object_setattr = object.__setattr__
+
+
+def _trusted_layout(model_cls: type) -> _TrustedLayout:
+    layout = _TRUSTED_LAYOUTS.get(model_cls)
+    if layout is None:
+        defaults: Dict[str, Any] = {}
+        factories: List[Tuple[str, Callable[[], Any]]] = []
+        metrics_fields: List[Tuple[str, type]] = []
+        for name, field in model_cls.model_fields.items():
+            factory = field.default_factory
+            if factory is None:
+                if not field.is_required(): defaults[name] = field.default
+            elif isinstance(factory, type) and issubclass(factory, BasePeriodMetrics):
+                metrics_fields.append((name, factory))
+            else:
+                factories.append((name, factory))
+        layout = _TRUSTED_LAYOUTS[model_cls] = (defaults, factories, metrics_fields)
+    return layout
+
+
+def _new_trusted(model_cls: Type[ModelT], values: Dict[str, Any], pool: "MetricsPool") -> ModelT:
+    """Equivalente a `model_construct` con el layout cacheado."""
+    defaults, factories, metrics_fields = _trusted_layout(model_cls)
+    data = defaults.copy()
+    for name, factory in factories:
+        if name not in values: data[name] = factory()
+    for name, metrics_cls in metrics_fields:
+        if name not in values: data[name] = pool.acquire(metrics_cls)
+    data.update(values)
+    instance = object.__new__(model_cls)
+    _object_setattr(instance, "__dict__", data)
+    _object_setattr(instance, "__pydantic_fields_set__", set(values))
+    _object_setattr(instance, "__pydantic_extra__", None)
+    _object_setattr(instance, "__pydantic_private__", None)
+    return instance
+
+
+class MetricsPool:
+    """Pool de objetos de métricas reciclados, por clase de métricas."""
+
+    def __init__(self, max_size_per_class: int = 1024):
+        self.max_size_per_class = max_size_per_class
+        self._free: Dict[type, List[BasePeriodMetrics]] = {}
+
+    def acquire(self, metrics_cls: Type[MetricsT]) -> MetricsT:
+        """Devuelve unas métricas a cero, recicladas si hay disponibles."""
+        free = self._free.get(metrics_cls)
+        if free:
+            metrics = free.pop()
+            metrics.__dict__.update(_trusted_layout(metrics_cls)[0])
+            _object_setattr(metrics, "__pydantic_fields_set__", set())
+            return metrics
+        return _new_trusted(metrics_cls, {}, self)
+
+    def release(self, metrics: Optional[BasePeriodMetrics]) -> None:
+        """Devuelve unas métricas al pool. El llamador no debe volver a usarlas."""
+        if metrics is None: return
+        free = self._free.setdefault(type(metrics), [])
+        if len(free) < self.max_size_per_class:
+            free.append(metrics)
+
+
+METRICS_POOL = MetricsPool()
+
+
+def construct_trusted(model_cls: Type[ModelT], pool: MetricsPool = METRICS_POOL, **values: Any) -> ModelT:
+    """
+    Crea un período SIN validación. Solo para datos producidos internamente.
+    Si no se pasan métricas, se toman del pool (recicladas o nuevas, siempre a cero).
+    """
+    return _new_trusted(model_cls, values, pool)
+
+
+def copy_trusted(period: ModelT, pool: MetricsPool = METRICS_POOL, **update: Any) -> ModelT:
+    """
+    Copia un período SIN validación. Las listas, las métricas y los modelos anidados
+    (p.ej. `impulso_alcista`) se copian recursivamente. Los deques de historial se duplican,
+    pero sus elementos (períodos ya cerrados) se comparten con el original.
+    """
+    new = period.model_copy(update=update)
+    data = new.__dict__
+    for name, value in data.items():
+        if name in update: continue
+        if isinstance(value, list):
+            data[name] = list(value)
+        elif isinstance(value, deque):
+            data[name] = deque(value, maxlen=value.maxlen)
+        elif isinstance(value, BasePeriodMetrics):
+            metrics = pool.acquire(type(value))
+            metrics.__dict__.update(value.__dict__)
+            data[name] = metrics
+        elif isinstance(value, BaseModel):
+            data[name] = copy_trusted(value, pool)
+    return new
+
+
+def append_history(
+    history: Deque[Any],
+    period: Any,
+    recycle: bool = False,
+    pool: MetricsPool = METRICS_POOL,
+    on_evict: Optional[Callable[[Any], None]] = None,
+) -> None:
+    """
+    Añade un período cerrado a un historial con maxlen. `on_evict` recibe el período expulsado
+    (p.ej. para sacarlo del índice de intervalos). Con `recycle=True`, sus métricas vuelven
+    al pool solo si, tras la expulsión, nadie más referencia ese período (otro historial,
+    el índice de intervalos, un informe...). Las métricas pertenecen a su período: no deben
+    guardarse referencias sueltas a ellas fuera de él.
+    """
+    if history.maxlen is None or len(history) < history.maxlen:
+        history.append(period)
+        return
+
+    evicted = history[0]
+    if on_evict is not None:
+        on_evict(evicted)
+    metrics = evicted.__dict__.get("metrics") if recycle else None
+    evicted_ref = weakref.ref(evicted) if metrics is not None else None
+    del evicted
+    history.append(period)
+
+    # Si el período sigue vivo en otra parte conserva sus métricas y no se recicla nada
+    if evicted_ref is not None and evicted_ref() is None:
+        pool.release(metrics)
+
 # --- MODELOS DE DATOS ANALÍTICOS ---
 
 class AlignmentData(BaseModel):
@@ -251,6 +405,8 @@ class AlignmentData(BaseModel):
     weighted_intra_period_matrix: Dict[str, Dict[str, float]] = Field(default_factory=dict)
     inter_period_matrix: Dict[str, Dict[str, float]] = Field(default_factory=dict)
     weighted_inter_period_matrix: Dict[str, Dict[str, float]] = Field(default_factory=dict)
+    # Multiplicador del Context Modulator por nivel cósmico (aplicado en la matriz inter ponderada)
+    level_context_multipliers: Dict[str, float] = Field(default_factory=dict)
     
     # Scores Agregados
     period_health_scores: Dict[str, float] = Field(default_factory=dict)
@@ -322,6 +478,7 @@ __all__ = [
     "MacroPeriodData",
     "PartialPhaseData",
     "PartialImpulseData",
+    "MacdCycleData",
     "TotalImpulseData",
     "TotalTrendData",
     "GlobalTotalImpulseData",
@@ -332,5 +489,10 @@ __all__ = [
     "AlignmentData",
     "TradeSimulationData",
     "TradeAutopsyReport",
-    "SymbolRankingMetrics"
+    "SymbolRankingMetrics",
+    "MetricsPool",
+    "METRICS_POOL",
+    "construct_trusted",
+    "copy_trusted",
+    "append_history",
 ]
\ No newline at end of file
@@ -0,0 +1,326 @@
+# BingXServices/TradingService/flight_recorder.py
+"""
+La "Caja Negra" de MIGUEL: flight recorder de baja sobrecarga para el hot path analítico.
+
+Cada evento se guarda como un registro binario de tamaño fijo en un ring buffer en memoria.
+No se formatea nada hasta que el buffer se vuelca a disco (bajo demanda, al detectar una
+supernova o al producirse un error). Los volcados automáticos solo copian el buffer en el
+hot path; la escritura a disco la hace un hilo en segundo plano. El volcado se lee con el
+decodificador CLI:
+
+    python -m BingXServices.TradingService.flight_recorder <fichero.bin> [--symbol BTC-USDT] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import struct
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .config.config_loader import AppConfig
+
+logger = logging.getLogger(__name__)
+
+# --- Etapas del pipeline de MIGUEL ---
+STAGE_COLLECT = 1
+STAGE_KINEMATICS = 2
+STAGE_MATRICES = 3
+STAGE_SCORES = 4
+STAGE_SUPERNOVA = 5
+STAGE_ERROR = 6
+
+STAGE_NAMES: Dict[int, str] = {
+    STAGE_COLLECT: "collect",
+    STAGE_KINEMATICS: "kinematics",
+    STAGE_MATRICES: "matrices",
+    STAGE_SCORES: "scores",
+    STAGE_SUPERNOVA: "supernova",
+    STAGE_ERROR: "error",
+}
+
+# symbol_id, stage, n_periods, wall_ts_ms, start_ns, duration_ns,
+# global_alignment, side_struggle, struggle_velocity, struggle_acceleration
+RECORD = struct.Struct("<HBBqqIffff")
+RECORD_FIELDS = (
+    "symbol_id", "stage", "n_periods", "wall_ts_ms", "start_ns", "duration_ns",
+    "global_alignment_score", "side_struggle_score", "struggle_score_velocity", "struggle_score_acceleration",
+)
+
+DUMP_MAGIC = b"MIGFLT01"
+DUMP_HEADER = struct.Struct("<8sIIQI")  # magic, record_size, n_records, dropped, symbol_table_len
+
+_MAX_U32 = 0xFFFFFFFF
+_MAX_F32 = 3.4028234663852886e38
+
+# Los símbolos más allá de la capacidad del campo u16 comparten este id (se decodifica como "#overflow").
+OVERFLOW_SYMBOL_ID = 0xFFFF
+
+# Umbral por defecto de supernova: |aceleración del SideStruggleScore| en puntos/s².
+# El score va de -100 a +100; 50 puntos/s² equivale a que su velocidad cambie en media escala
+# en un segundo, algo que solo ocurre en un giro brusco de alineación de la jerarquía.
+# Un valor <= 0 desactiva el volcado por supernova.
+DEFAULT_SUPERNOVA_ACCELERATION_THRESHOLD = 50.0
+
+
+def _f32(value: float) -> float:
+    """Satura al rango de float32 (NaN pasa tal cual) para que el empaquetado nunca falle."""
+    if value > _MAX_F32: return _MAX_F32
+    if value < -_MAX_F32: return -_MAX_F32
+    return value
+
+
+class FlightRecorder:
+    """
+    Ring buffer de registros binarios de tamaño fijo, con muestreo por símbolo.
+    Los registros de supernova y de error se graban siempre, independientemente del muestreo.
+    """
+    def __init__(
+        self,
+        capacity: int = 65536,
+        sample_every: int = 1,
+        dump_dir: str = "data/flight_recorder",
+        supernova_acceleration_threshold: float = DEFAULT_SUPERNOVA_ACCELERATION_THRESHOLD,
+        auto_dump_cooldown_seconds: float = 60.0,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.capacity = max(1, int(capacity))
+        self.dump_dir = dump_dir
+        self.supernova_acceleration_threshold = float(supernova_acceleration_threshold)
+        self.auto_dump_cooldown_seconds = float(auto_dump_cooldown_seconds)
+
+        self._buffer = bytearray(self.capacity * RECORD.size)
+        self._pack_into = RECORD.pack_into
+        # Ancla reloj de pared <-> perf_counter para no leer la hora en cada registro
+        self._wall_offset_ns = time.time_ns() - time.perf_counter_ns()
+        self._written = 0  # Total de registros escritos desde el arranque
+
+        self._symbol_ids: Dict[str, int] = {}
+        self._symbols: List[str] = []
+
+        # Muestreo: 1 de cada N ticks por símbolo
+        self.default_sample_every = max(1, int(sample_every))
+        self._sample_every: Dict[str, int] = {}
+        self._sample_counters: Dict[str, int] = {}
+
+        self._last_auto_dump: Optional[float] = None
+        # Escritor de volcados automáticos (un único hilo, se crea al primer volcado)
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._pending_dumps: List[Future] = []
+
+    @classmethod
+    def from_config(cls, app_config: "AppConfig") -> "FlightRecorder":
+        """Construye el recorder desde `flight_recorder_params`; si no existen, usa los valores por defecto."""
+        params = getattr(app_config.services.trading_service, "flight_recorder_params", None)
+        if params is None:
+            return cls()
+        if not isinstance(params, dict):
+            params = params.model_dump() if hasattr(params, "model_dump") else vars(params)
+        recorder = cls(**{k: v for k, v in params.items() if k != "symbol_sample_every"})
+        for symbol, every in (params.get("symbol_sample_every") or {}).items():
+            recorder.set_sampling(symbol, every)
+        return recorder
+
+    # --- Muestreo ---
+
+    def set_sampling(self, symbol: str, every: int) -> None:
+        """Registra 1 de cada `every` ticks del símbolo (1 = fidelidad completa)."""
+        self._sample_every[symbol] = max(1, int(every))
+
+    def should_sample(self, symbol: str) -> bool:
+        if not self.enabled:
+            return False
+        every = self._sample_every.get(symbol, self.default_sample_every)
+        if every == 1:
+            return True
+        count = self._sample_counters.get(symbol, 0)
+        self._sample_counters[symbol] = count + 1
+        return count % every == 0
+
+    # --- Escritura (hot path) ---
+
+    def symbol_id(self, symbol: str) -> int:
+        sid = self._symbol_ids.get(symbol)
+        if sid is None:
+            if len(self._symbols) >= OVERFLOW_SYMBOL_ID:
+                sid = self._symbol_ids[symbol] = OVERFLOW_SYMBOL_ID
+            else:
+                sid = self._symbol_ids[symbol] = len(self._symbols)
+                self._symbols.append(symbol)
+        return sid
+
+    def record(
+        self,
+        symbol: str,
+        stage: int,
+        start_ns: int,
+        end_ns: int,
+        n_periods: int = 0,
+        global_alignment: float = 0.0,
+        side_struggle: float = 0.0,
+        struggle_velocity: float = 0.0,
+        struggle_acceleration: float = 0.0,
+    ) -> None:
+        """Escribe un registro en el ring buffer. Sin formateo ni asignaciones de texto; nunca lanza."""
+        if not self.enabled:
+            return
+        sid = self._symbol_ids.get(symbol)
+        if sid is None:
+            sid = self.symbol_id(symbol)
+        duration_ns = end_ns - start_ns
+        self._pack_into(
+            self._buffer, (self._written % self.capacity) * RECORD.size,
+            sid, stage, n_periods if n_periods < 255 else 255, (start_ns + self._wall_offset_ns) // 1_000_000,
+            start_ns, duration_ns if 0 <= duration_ns < _MAX_U32 else (0 if duration_ns < 0 else _MAX_U32),
+            _f32(global_alignment), _f32(side_struggle), _f32(struggle_velocity), _f32(struggle_acceleration),
+        )
+        self._written += 1
+
+    def is_supernova(self, struggle_acceleration: float) -> bool:
+        """True si |aceleración del SideStruggleScore| (puntos/s²) alcanza el umbral configurado."""
+        return self.enabled and self.supernova_acceleration_threshold > 0 and abs(struggle_acceleration) >= self.supernova_acceleration_threshold
+
+    # --- Volcado ---
+
+    def snapshot(self) -> bytes:
+        """Copia de los registros vivos en orden cronológico."""
+        buffer = memoryview(self._buffer)
+        if self._written <= self.capacity:
+            return bytes(buffer[: self._written * RECORD.size])
+        # Una sola copia: join reserva el resultado y copia los dos tramos directamente
+        split = (self._written % self.capacity) * RECORD.size
+        return b"".join((buffer[split:], buffer[:split]))
+
+    def _dump_path(self, reason: str) -> str:
+        return os.path.join(self.dump_dir, f"flight_{reason}_{time.time_ns() // 1_000_000}.bin")
+
+    def _write_dump(self, reason: str, path: str, records: bytes, symbols: List[str], written: int) -> str:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        n_records = len(records) // RECORD.size
+        symbol_table = json.dumps(symbols).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(DUMP_HEADER.pack(DUMP_MAGIC, RECORD.size, n_records, written - n_records, len(symbol_table)))
+            f.write(symbol_table)
+            f.write(records)
+        logger.info(f"Flight recorder volcado ({reason}): {n_records} registros en {path}")
+        return path
+
+    def _write_dump_safe(self, reason: str, path: str, records: bytes, symbols: List[str], written: int) -> Optional[str]:
+        try:
+            return self._write_dump(reason, path, records, symbols, written)
+        except OSError as e:
+            logger.error(f"No se pudo volcar el flight recorder ({reason}): {e}")
+            return None
+
+    def dump(self, reason: str = "manual", path: Optional[str] = None) -> str:
+        """Vuelca el buffer a disco de forma síncrona y devuelve la ruta del fichero."""
+        return self._write_dump(reason, path or self._dump_path(reason), self.snapshot(), list(self._symbols), self._written)
+
+    def auto_dump(self, reason: str) -> Optional[str]:
+        """
+        Volcado disparado por un evento (supernova/error), limitado por un cooldown.
+        En el hot path solo se copia el buffer; la escritura se encola en el hilo escritor.
+        Devuelve la ruta en la que se escribirá el volcado, o None si el recorder está
+        desactivado o el cooldown lo descarta.
+        """
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        if self._last_auto_dump is not None and now - self._last_auto_dump < self.auto_dump_cooldown_seconds:
+            return None
+        self._last_auto_dump = now
+        path = self._dump_path(reason)
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="flight-recorder")
+        self._pending_dumps = [f for f in self._pending_dumps if not f.done()]
+        self._pending_dumps.append(
+            self._writer.submit(self._write_dump_safe, reason, path, self.snapshot(), list(self._symbols), self._written)
+        )
+        return path
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Espera a que terminen los volcados automáticos pendientes."""
+        for future in list(self._pending_dumps):
+            future.result(timeout)
+        self._pending_dumps.clear()
+
+    def close(self) -> None:
+        """Termina los volcados pendientes y libera el hilo escritor."""
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        self._pending_dumps.clear()
+
+
+# --- Decodificador ---
+
+def decode_dump(path: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """Lee un volcado y devuelve (cabecera, iterador de registros decodificados)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, record_size, n_records, dropped, table_len = DUMP_HEADER.unpack_from(data, 0)
+    if magic != DUMP_MAGIC or record_size != RECORD.size:
+        raise ValueError(f"{path} no es un volcado válido del flight recorder")
+    offset = DUMP_HEADER.size
+    symbols: List[str] = json.loads(data[offset: offset + table_len].decode("utf-8"))
+    offset += table_len
+    header = {"n_records": n_records, "dropped": dropped, "symbols": symbols}
+
+    def _iter() -> Iterator[Dict[str, Any]]:
+        for values in RECORD.iter_unpack(data[offset: offset + n_records * RECORD.size]):
+            rec = dict(zip(RECORD_FIELDS, values))
+            sid = rec["symbol_id"]
+            rec["symbol"] = symbols[sid] if sid < len(symbols) else "#overflow" if sid == OVERFLOW_SYMBOL_ID else f"#{sid}"
+            rec["stage_name"] = STAGE_NAMES.get(rec["stage"], str(rec["stage"]))
+            yield rec
+
+    return header, _iter()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Decodifica un volcado del flight recorder de MIGUEL.")
+    parser.add_argument("path")
+    parser.add_argument("--symbol", help="Filtra por símbolo")
+    parser.add_argument("--stage", choices=sorted(STAGE_NAMES.values()), help="Filtra por etapa")
+    parser.add_argument("--json", action="store_true", help="Un objeto JSON por línea")
+    args = parser.parse_args(argv)
+
+    header, records = decode_dump(args.path)
+    if not args.json:
+        print(f"# {header['n_records']} registros ({header['dropped']} sobrescritos), {len(header['symbols'])} símbolos")
+    for rec in records:
+        if args.symbol and rec["symbol"] != args.symbol: continue
+        if args.stage and rec["stage_name"] != args.stage: continue
+        if args.json:
+            print(json.dumps(rec))
+        else:
+            print(
+                f"{rec['wall_ts_ms']} {rec['symbol']:<16} {rec['stage_name']:<10} "
+                f"periods={rec['n_periods']:<3} dur={rec['duration_ns'] / 1000:9.1f}us "
+                f"align={rec['global_alignment_score']:+.4f} struggle={rec['side_struggle_score']:+.4f} "
+                f"vel={rec['struggle_score_velocity']:+.4f} accel={rec['struggle_score_acceleration']:+.4f}"
+            )
+    return 0
+
+
+__all__ = [
+    "FlightRecorder",
+    "decode_dump",
+    "STAGE_COLLECT",
+    "STAGE_KINEMATICS",
+    "STAGE_MATRICES",
+    "STAGE_SCORES",
+    "STAGE_SUPERNOVA",
+    "STAGE_ERROR",
+]
+
+if __name__ == "__main__":
+    sys.exit(main())
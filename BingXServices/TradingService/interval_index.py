@@ -0,0 +1,198 @@
+# BingXServices/TradingService/interval_index.py
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# (nivel, entry_ts, exit_ts, período)
+IntervalHit = Tuple[str, int, int, Any]
+
+
+class LevelIntervals:
+    """
+    Intervalos [entry_ts, exit_ts] de un nivel cósmico, ordenados por entry_ts.
+    Como se conoce la duración máxima de los intervalos vivos del nivel, cualquier consulta
+    se reduce a una búsqueda binaria sobre la ventana [inicio - duración_máxima, fin] de entradas.
+    La cota se recalcula cuando sale (o se acorta) el intervalo que la fijaba, de modo que un
+    período atípicamente largo deja de ensanchar las consultas en cuanto se expulsa.
+    """
+    __slots__ = ("entries", "exits", "periods", "max_length", "max_history")
+
+    def __init__(self, max_history: int):
+        self.entries: List[int] = []
+        self.exits: List[int] = []
+        self.periods: List[Any] = []
+        self.max_length = 0  # Duración máxima de los intervalos presentes
+        self.max_history = max_history
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _recompute_max_length(self) -> None:
+        self.max_length = max((x - e for e, x in zip(self.entries, self.exits)), default=0)
+
+    def _delete(self, i: int) -> None:
+        length = self.exits[i] - self.entries[i]
+        del self.entries[i], self.exits[i], self.periods[i]
+        if length >= self.max_length:
+            self._recompute_max_length()
+
+    def _find(self, entry_ts: int) -> int:
+        i = bisect_left(self.entries, entry_ts)
+        return i if i < len(self.entries) and self.entries[i] == entry_ts else -1
+
+    def upsert(self, entry_ts: int, exit_ts: int, period: Any) -> None:
+        """Inserta o actualiza el intervalo que empieza en `entry_ts`."""
+        # Un período abierto (exit_ts == 0) se indexa como [entry, entry] hasta que se fija su salida.
+        # A diferencia del antiguo _is_contained sobre la pareja (entry_ts, exit_ts) en vivo, no
+        # contiene a nadie ni tiene duración, así que puede cambiar pesos respecto a esa versión.
+        exit_ts = max(exit_ts, entry_ts)
+        length = exit_ts - entry_ts
+        i = bisect_left(self.entries, entry_ts)
+        if i < len(self.entries) and self.entries[i] == entry_ts:
+            old_length = self.exits[i] - entry_ts
+            self.exits[i] = exit_ts
+            self.periods[i] = period
+            if length < old_length and old_length >= self.max_length:
+                self._recompute_max_length()
+        else:
+            self.entries.insert(i, entry_ts)
+            self.exits.insert(i, exit_ts)
+            self.periods.insert(i, period)
+        if length > self.max_length:
+            self.max_length = length
+        if len(self.entries) > self.max_history:
+            # Igual que los deques con maxlen: se descarta el más antiguo
+            self._delete(0)
+
+    def remove(self, entry_ts: int) -> bool:
+        """Elimina el intervalo que empieza en `entry_ts`, si existe."""
+        i = self._find(entry_ts)
+        if i < 0: return False
+        self._delete(i)
+        return True
+
+    def period_at(self, entry_ts: int) -> Any:
+        i = self._find(entry_ts)
+        return self.periods[i] if i >= 0 else None
+
+    def get(self, entry_ts: int) -> Optional[Tuple[int, int]]:
+        i = self._find(entry_ts)
+        return (self.entries[i], self.exits[i]) if i >= 0 else None
+
+    def _window(self, lo: int, hi: int) -> range:
+        return range(bisect_left(self.entries, lo), bisect_right(self.entries, hi))
+
+    def stab(self, ts: int) -> Iterable[int]:
+        """Índices de los intervalos que contienen el instante `ts`."""
+        return (i for i in self._window(ts - self.max_length, ts) if self.exits[i] >= ts)
+
+    def overlapping(self, start: int, end: int) -> Iterable[int]:
+        """Índices de los intervalos que se solapan con [start, end]."""
+        return (i for i in self._window(start - self.max_length, end) if self.exits[i] >= start)
+
+    def contained_in(self, start: int, end: int) -> Iterable[int]:
+        """Índices de los intervalos completamente dentro de [start, end]."""
+        return (i for i in self._window(start, end) if self.exits[i] <= end)
+
+    def containing(self, start: int, end: int) -> Iterable[int]:
+        """Índices de los intervalos que contienen completamente a [start, end]."""
+        return (i for i in self._window(end - self.max_length, start) if self.exits[i] >= end)
+
+
+class CosmicIntervalIndex:
+    """
+    Índice de intervalos de un símbolo sobre los períodos actuales e históricos de los 13 niveles.
+    Se actualiza incrementalmente: cada período se identifica por (nivel, entry_ts), su
+    exit_ts se refresca en sitio mientras está abierto y se fija al cerrarse.
+    Por nivel se conservan el período activo más los 50 últimos cerrados (el maxlen de los deques).
+    """
+    def __init__(self, symbol: str, max_history: int = 51):
+        self.symbol = symbol
+        self.max_history = max_history
+        self.levels: Dict[str, LevelIntervals] = {}
+        self.current_entries: Dict[str, int] = {}
+
+    def _level(self, level: str) -> LevelIntervals:
+        intervals = self.levels.get(level)
+        if intervals is None:
+            intervals = self.levels[level] = LevelIntervals(self.max_history)
+        return intervals
+
+    def add(self, level: str, period: Any) -> None:
+        """Registra (o actualiza) un período histórico del nivel."""
+        entry_ts = int(period.entry_ts)
+        if entry_ts <= 0: return  # Sin entry_ts no hay intervalo: el período no participa en la contención
+        self._level(level).upsert(entry_ts, int(period.exit_ts), period)
+
+    def observe_current(self, level: str, period: Any) -> bool:
+        """
+        Registra el período activo del nivel. Devuelve True si es un período nuevo
+        (el anterior queda cerrado en el índice como histórico).
+        """
+        entry_ts = int(period.entry_ts)
+        if entry_ts <= 0: return False
+        is_new = self.current_entries.get(level) != entry_ts
+        if is_new:
+            self.close_current(level)
+        self._level(level).upsert(entry_ts, int(period.exit_ts), period)
+        self.current_entries[level] = entry_ts
+        return is_new
+
+    def close_current(self, level: str) -> None:
+        """
+        Cierra el período activo del nivel, releyendo su exit_ts definitivo del propio período
+        (en el último tick en que se vio activo aún no estaba fijado).
+        """
+        entry_ts = self.current_entries.pop(level, None)
+        if entry_ts is None: return
+        intervals = self.levels[level]
+        period = intervals.period_at(entry_ts)
+        if period is not None:
+            intervals.upsert(entry_ts, int(period.exit_ts), period)
+
+    def remove(self, level: str, period: Any) -> bool:
+        """Saca un período del índice (p.ej. al expulsarlo definitivamente de su historial)."""
+        intervals = self.levels.get(level)
+        if intervals is None: return False
+        entry_ts = int(period.entry_ts)
+        if intervals.period_at(entry_ts) is not period: return False
+        if self.current_entries.get(level) == entry_ts:
+            del self.current_entries[level]
+        return intervals.remove(entry_ts)
+
+    def current_interval(self, level: str) -> Optional[Tuple[int, int]]:
+        entry_ts = self.current_entries.get(level)
+        if entry_ts is None: return None
+        return self.levels[level].get(entry_ts)
+
+    def _collect(self, method: str, args: Tuple[int, ...], levels: Optional[Iterable[str]]) -> List[IntervalHit]:
+        hits: List[IntervalHit] = []
+        for level in (levels if levels is not None else list(self.levels)):
+            intervals = self.levels.get(level)
+            if not intervals: continue
+            for i in getattr(intervals, method)(*args):
+                hits.append((level, intervals.entries[i], intervals.exits[i], intervals.periods[i]))
+        return hits
+
+    def stab(self, ts: int, levels: Optional[Iterable[str]] = None) -> List[IntervalHit]:
+        """Períodos (actuales o históricos) activos en el instante `ts`."""
+        return self._collect("stab", (ts,), levels)
+
+    def overlapping(self, start: int, end: int, levels: Optional[Iterable[str]] = None) -> List[IntervalHit]:
+        """Períodos que se solapan con [start, end]."""
+        return self._collect("overlapping", (start, end), levels)
+
+    def contained_in(self, start: int, end: int, levels: Optional[Iterable[str]] = None) -> List[IntervalHit]:
+        """Períodos anidados dentro de [start, end]. Ej: los MacdCycle de una tendencia."""
+        return self._collect("contained_in", (start, end), levels)
+
+    def containing(self, start: int, end: int, levels: Optional[Iterable[str]] = None) -> List[IntervalHit]:
+        """Períodos que envuelven a [start, end]."""
+        return self._collect("containing", (start, end), levels)
+
+
+__all__ = [
+    "CosmicIntervalIndex",
+    "LevelIntervals",
+]
@@ -4,11 +4,22 @@ from __future__ import annotations
 import logging
 import time
 from decimal import Decimal
-from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 import numpy as np
 
+from .context_modulator import ContextModulator
 from .data_models import MacroPeriodData, MicroPeriodData, PeriodData
+from .flight_recorder import (
+    STAGE_COLLECT,
+    STAGE_ERROR,
+    STAGE_KINEMATICS,
+    STAGE_MATRICES,
+    STAGE_SCORES,
+    STAGE_SUPERNOVA,
+    FlightRecorder,
+)
+from .interval_index import CosmicIntervalIndex
 from .trading_types import (
     ONE,
     SAFE_DIVISION_THRESHOLD,
@@ -24,6 +35,23 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# Historiales (deques) o referencias que cada nivel guarda de sus períodos hijos: nivel -> {atributo: nivel hijo}
+# Los niveles sin padre que los archive (GrupoLocal5m..Universo4h) se cierran al dejar de estar activos.
+HISTORY_SOURCES: Dict[str, Dict[str, str]] = {
+    "Marea": {"phase_history": "Ola"},
+    "LuchaMareas": {"impulso_alcista": "Marea", "impulso_bajista": "Marea"},
+    "Corriente1m": {"macd_cycle_history": "LuchaMareas"},
+    "Tierra1m": {"total_impulse_history": "Corriente1m"},
+    "Luna5m": {"total_impulse_history": "Corriente1m"},
+    "Sol15m": {"total_impulse_history": "Corriente1m"},
+    "SistemaSolar1h": {"total_impulse_history": "Corriente1m"},
+    "ViaLactea4h": {"total_impulse_history": "Corriente1m"},
+    "GrupoLocal5m": {"global_total_impulse_history": "Luna5m", "total_trend_history": "Tierra1m"},
+    "CumuloVirgo15m": {"global_total_impulse_history": "Sol15m", "total_trend_history": "Tierra1m"},
+    "Andromeda1h": {"global_total_impulse_history": "SistemaSolar1h", "total_trend_history": "Tierra1m"},
+    "Universo4h": {"global_total_impulse_history": "ViaLactea4h", "total_trend_history": "Tierra1m"},
+}
+
 class MetricsManager:
     """
     El Arcángel MIGUEL (Oculus_Hyperion): Comandante Analítico (v.Sismógrafo).
@@ -35,10 +63,9 @@ class MetricsManager:
     - 13 niveles de análisis temporal
     - Matrices de alineamiento intra e inter-período
     - Sismógrafo de supernovas (derivadas del SideStruggleScore)
+    - Context Modulator con ponderación DINÁMICA (ADX, ATR normalizado y Volumen)
     
     PENDIENTE DE IMPLEMENTAR:
-    - Context Modulator con ponderación DINÁMICA
-    - Factores ADX, ATR normalizado y Volumen
     - Auto-aprendizaje basado en correlación histórica reciente
     """
     def __init__(self, app_config: "AppConfig"):
@@ -57,28 +84,74 @@ class MetricsManager:
         # Historial para calcular derivadas del SideStruggleScore
         self.struggle_score_history: Dict[str, List[Tuple[int, float]]] = {}
         
-        # TODO: Implementar Context Modulator para ponderación dinámica
-        # self.context_modulator = ContextModulator()
+        # Índice de intervalos por símbolo sobre los períodos actuales e históricos
+        self.interval_indexes: Dict[str, CosmicIntervalIndex] = {}
+
+        # Context Modulator: ponderación dinámica por régimen de mercado (None = ponderación estática)
+        self.context_modulator: Optional[ContextModulator] = ContextModulator(app_config)
+
+        # Caja negra del hot path analítico (registros binarios, sin formateo hasta el volcado)
+        self.flight_recorder = FlightRecorder.from_config(app_config)
+
+    def update_market_context(self, symbol: str, timeframe: str, high: Decimal, low: Decimal, close: Decimal, volume: Decimal):
+        """Alimenta al Context Modulator con una vela cerrada del timeframe indicado."""
+        if self.context_modulator:
+            self.context_modulator.update_bar(symbol, timeframe, high, low, close, volume)
 
     def update_all_metrics(self, ps: "TradingPositionState"):
         """Punto de entrada principal. Orquesta todos los análisis de Miguel."""
+        try:
+            self._run_all_metrics(ps, self.flight_recorder.should_sample(ps.symbol))
+        except Exception:
+            now_ns = time.perf_counter_ns()
+            self.flight_recorder.record(ps.symbol, STAGE_ERROR, now_ns, now_ns)
+            self.flight_recorder.auto_dump("error")
+            raise
+
+    def _run_all_metrics(self, ps: "TradingPositionState", sampled: bool):
+        """Pipeline de Miguel. Si `sampled`, cada etapa deja su registro en el flight recorder."""
+        recorder = self.flight_recorder
+        t0 = time.perf_counter_ns()
         all_periods = self._collect_all_periods(ps)
+        n_periods = len(all_periods)
+        t1 = time.perf_counter_ns()
+        if sampled: recorder.record(ps.symbol, STAGE_COLLECT, t0, t1, n_periods)
         if not all_periods: return
+        interval_index = self._sync_interval_index(ps.symbol, all_periods)
+
+        # 0. Multiplicadores dinámicos del Context Modulator (None si está desactivado)
+        level_multipliers = self.context_modulator.get_level_multipliers(ps.symbol) if self.context_modulator else None
 
         # 1. Calcular cinemática base
         self._calculate_and_store_all_kinematics(all_periods)
+        t2 = time.perf_counter_ns()
+        if sampled: recorder.record(ps.symbol, STAGE_KINEMATICS, t1, t2, n_periods)
         
         # 2. Calcular matrices y salud interna
         intra_matrices, health_scores = self._calculate_all_intra_period_matrices(all_periods)
-        inter_matrix, weighted_inter_matrix = self._calculate_inter_period_matrices(health_scores, all_periods)
+        inter_matrix, weighted_inter_matrix = self._calculate_inter_period_matrices(health_scores, all_periods, interval_index, level_multipliers)
+        t3 = time.perf_counter_ns()
+        if sampled: recorder.record(ps.symbol, STAGE_MATRICES, t2, t3, n_periods)
         
         # 3. Calcular scores finales, incluyendo el sismógrafo de supernovas
         final_scores = self._calculate_final_scores(ps.symbol, weighted_inter_matrix, health_scores)
+        t4 = time.perf_counter_ns()
+        score_fields = (
+            final_scores["global_alignment_score"],
+            final_scores["side_struggle_score"],
+            final_scores["struggle_score_velocity"],
+            final_scores["struggle_score_acceleration"],
+        )
+        if sampled: recorder.record(ps.symbol, STAGE_SCORES, t3, t4, n_periods, *score_fields)
+        if recorder.is_supernova(final_scores["struggle_score_acceleration"]):
+            recorder.record(ps.symbol, STAGE_SUPERNOVA, t0, t4, n_periods, *score_fields)
+            recorder.auto_dump("supernova")
 
         # 4. Poblar el objeto AlignmentData con todos los resultados
         alignment_data = ps.ranking_metrics.alignment_data
         alignment_data.intra_period_matrix = intra_matrices
         alignment_data.weighted_intra_period_matrix = intra_matrices # Placeholder para la ponderación intra
+        alignment_data.level_context_multipliers = level_multipliers or {}
         alignment_data.inter_period_matrix = inter_matrix
         alignment_data.weighted_inter_period_matrix = weighted_inter_matrix
         alignment_data.period_health_scores = health_scores
@@ -88,8 +161,6 @@ class MetricsManager:
             setattr(alignment_data, key, value)
             
         alignment_data.last_update_ts = int(time.time() * 1000)
-        
-        logger.debug(f"[{ps.symbol}] Matrices y scores de Miguel calculados. Supernova Accel: {final_scores.get('struggle_score_acceleration', 0.0):.4f}")
 
     def _collect_all_periods(self, ps: "TradingPositionState") -> Dict[str, PeriodData]:
         """Reúne a TODOS los 'soldados' (períodos activos) para el análisis de los 13 niveles cósmicos."""
@@ -159,7 +230,6 @@ class MetricsManager:
             if cosmic.universe_trend.current_global_trend and cosmic.universe_trend.current_global_trend.active:
                 periods["Universo4h"] = cosmic.universe_trend.current_global_trend
 
-        logger.debug(f"[{ps.symbol}] Recolectados {len(periods)} períodos activos de la jerarquía cósmica: {list(periods.keys())}")
         return periods
 
     def _calculate_derivatives(self, history: List[Decimal], timestamps: List[int]) -> Tuple[Decimal, Decimal, Decimal]:
@@ -284,16 +354,51 @@ class MetricsManager:
         
         return intra_matrices, health_scores
 
-    def _is_contained(self, period_A: PeriodData, period_B: PeriodData) -> bool:
+    def _sync_interval_index(self, symbol: str, all_periods: Dict[str, PeriodData]) -> CosmicIntervalIndex:
+        """
+        Actualiza incrementalmente el índice de intervalos del símbolo con los períodos activos.
+        Cuando un nivel abre un período nuevo, se indexan los historiales que lo referencian
+        (así entran también los hijos que se cerraron sin llegar a observarse como activos).
+        Los niveles que dejan de estar activos se cierran con su exit_ts definitivo.
         """
-        Determina si el período A está temporalmente contenido dentro del período B.
+        index = self.interval_indexes.get(symbol)
+        if index is None:
+            index = self.interval_indexes[symbol] = CosmicIntervalIndex(symbol)
+
+        for level in [level for level in index.current_entries if level not in all_periods]:
+            index.close_current(level)
+
+        new_levels = {level for level, period in all_periods.items() if index.observe_current(level, period)}
+        if not new_levels: return index
+
+        for level, period in all_periods.items():
+            for attr, child_level in HISTORY_SOURCES.get(level, {}).items():
+                if level in new_levels or child_level in new_levels:
+                    children = getattr(period, attr, None)
+                    if children is None: continue
+                    if hasattr(children, "entry_ts"): children = (children,)
+                    for child in children:
+                        index.add(child_level, child)
+        return index
+
+    def _find_current_containers(self, index: CosmicIntervalIndex, period_names: List[str]) -> Dict[str, set]:
+        """
+        Para cada nivel, los niveles cuyo período ACTIVO lo contiene temporalmente.
         Ej: ¿Está este IT_1m dentro de la TT_1m actual?
         """
-        if not period_A.active or not period_B.active:
-            return False
-        return period_B.entry_ts <= period_A.entry_ts and period_B.exit_ts >= period_A.exit_ts
-
-    def _calculate_inter_period_matrices(self, health_scores: Dict[str, float], all_periods: Dict[str, PeriodData]) -> Tuple[Dict, Dict]:
+        containers: Dict[str, set] = {}
+        for name in period_names:
+            interval = index.current_interval(name)
+            if interval is None:
+                containers[name] = set()
+                continue
+            containers[name] = {
+                level for level, entry_ts, _, _ in index.containing(*interval, levels=period_names)
+                if index.current_entries.get(level) == entry_ts
+            }
+        return containers
+
+    def _calculate_inter_period_matrices(self, health_scores: Dict[str, float], all_periods: Dict[str, PeriodData], interval_index: CosmicIntervalIndex, level_multipliers: Optional[Dict[str, float]]) -> Tuple[Dict, Dict]:
         """
         Calcula el "Confluenciograma" (matrices inter-período) de la jerarquía cósmica,
         aplicando ponderación multifactorial que incluye la relevancia temporal.
@@ -301,9 +406,18 @@ class MetricsManager:
         inter_matrix: Dict[str, Dict[str, float]] = {}
         weighted_matrix: Dict[str, Dict[str, float]] = {}
         period_names = list(health_scores.keys())
+
+        # Contención y duraciones de los períodos activos, resueltas con el índice de intervalos
+        containers = self._find_current_containers(interval_index, period_names)
+        durations: Dict[str, int] = {}
+        for name in period_names:
+            interval = interval_index.current_interval(name)
+            durations[name] = (interval[1] - interval[0]) if interval else 0
         
         # Obtener los pesos cósmicos del config
         cosmic_weights = self.ranking_params.cosmic_weights
+        # (nivel_A, nivel_B, score base, peso estático, peso de contexto) de cada par
+        pair_weights: List[Tuple[str, str, float, float, float]] = []
 
         for i in range(len(period_names)):
             for j in range(i, len(period_names)):
@@ -327,26 +441,36 @@ class MetricsManager:
                 cosmic_w = cosmic_w1 * cosmic_w2
 
                 # Factor 2: Relevancia Temporal (¿qué fracción de B es A?)
-                duration_A = (period_A.exit_ts - period_A.entry_ts) if period_A.exit_ts > period_A.entry_ts else 0
-                duration_B = (period_B.exit_ts - period_B.entry_ts) if period_B.exit_ts > period_B.entry_ts else 0
+                duration_A, duration_B = durations[name1], durations[name2]
                 
                 temporal_relevance = 1.0 # Por defecto, no hay reducción
-                if self._is_contained(period_A, period_B) and duration_B > 0:
+                if name2 in containers[name1] and duration_B > 0:
                     temporal_relevance = duration_A / duration_B
-                elif self._is_contained(period_B, period_A) and duration_A > 0:
+                elif name1 in containers[name2] and duration_A > 0:
                     temporal_relevance = duration_B / duration_A
                 
                 # Factor 3: Feedback Loop (placeholder para el futuro)
                 feedback_w = 1.0
-                
-                # --- 3. Cálculo del Score Ponderado Final ---
-                final_weight = cosmic_w * temporal_relevance * feedback_w
-                weighted_score = round(base_alignment_score * final_weight, 4)
-                
-                # Rellenar la matriz ponderada
-                weighted_matrix.setdefault(name1, {})[name2] = weighted_score
-                weighted_matrix.setdefault(name2, {})[name1] = weighted_score
-                
+
+                # Factor 4: Contexto de Mercado (ADX, ATR normalizado y Volumen del Context Modulator)
+                context_w = level_multipliers.get(name1, 1.0) * level_multipliers.get(name2, 1.0) if level_multipliers else 1.0
+
+                pair_weights.append((name1, name2, base_alignment_score, cosmic_w * temporal_relevance * feedback_w, context_w))
+
+        # El contexto REPARTE el peso entre niveles, no cambia la escala del score:
+        # se normaliza para que su media sobre los pares activos sea exactamente 1.
+        context_sum = sum(pair[4] for pair in pair_weights)
+        context_norm = len(pair_weights) / context_sum if context_sum > 0 else 1.0
+
+        for name1, name2, base_alignment_score, static_w, context_w in pair_weights:
+            # --- 3. Cálculo del Score Ponderado Final ---
+            final_weight = static_w * context_w * context_norm
+            weighted_score = round(base_alignment_score * final_weight, 4)
+
+            # Rellenar la matriz ponderada
+            weighted_matrix.setdefault(name1, {})[name2] = weighted_score
+            weighted_matrix.setdefault(name2, {})[name1] = weighted_score
+
         return inter_matrix, weighted_matrix
 
     def _calculate_final_scores(self, symbol: str, weighted_matrix: Dict, health_scores: Dict) -> Dict[str, Any]:
@@ -0,0 +1,134 @@
+# BingXServices/benchmarks/bench_context_modulator.py
+"""
+Benchmark del Context Modulator sobre la latencia por tick de MetricsManager.update_all_metrics.
+
+Compara el pipeline con el Context Modulator desactivado (ponderación estática) con el completo,
+en el peor caso: una vela nueva en cada timeframe en cada tick. El objetivo es < 10% de sobrecoste.
+
+Uso:
+    python -m BingXServices.benchmarks.bench_context_modulator [--ticks 2000] [--repeat 3]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from BingXServices.TradingService.data_models import MacdCycleData
+from BingXServices.TradingService.metrics_manager import MetricsManager
+
+SYMBOL = "BTC-USDT"
+TIMEFRAMES = ("1m", "5m", "15m", "1h", "4h")
+MAX_OVERHEAD_PCT = 10.0
+
+
+def build_app_config() -> SimpleNamespace:
+    trading_service = SimpleNamespace(
+        ranking_params=SimpleNamespace(cosmic_weights={}),
+        adaptive_position_params=SimpleNamespace(volatility_window=14, volatility_lookback=100),
+    )
+    return SimpleNamespace(services=SimpleNamespace(trading_service=trading_service))
+
+
+def build_period(rng: random.Random, entry_ts: int, exit_ts: int) -> MacdCycleData:
+    period = MacdCycleData(active=True, side=rng.choice(["alcista", "bajista"]), entry_ts=entry_ts, exit_ts=exit_ts)
+    for i in range(8):
+        period.timestamps.append(entry_ts + i * 60_000)
+        period.price_history.append(Decimal(str(round(100 + rng.uniform(-1, 1), 4))))
+        period.macd_history.append(Decimal(str(round(rng.uniform(-0.5, 0.5), 4))))
+    return period
+
+
+BASE_TS = 1_700_000_000_000
+
+
+def build_position_state(rng: random.Random) -> SimpleNamespace:
+    """Estado sintético con los 13 niveles cósmicos activos, anidados en el tiempo."""
+    def holder(attr: str, duration_ms: int) -> SimpleNamespace:
+        # Cada nivel queda centrado dentro del de 4h, así el índice de intervalos trabaja de verdad
+        entry_ts = BASE_TS + (288_000_000 - duration_ms) // 2
+        return SimpleNamespace(**{attr: build_period(rng, entry_ts, entry_ts + duration_ms)})
+
+    cosmic = SimpleNamespace(
+        lunar_force=holder("current_global_impulse", 3_000_000),
+        solar_force=holder("current_global_impulse", 9_000_000),
+        solar_system_force=holder("current_global_impulse", 36_000_000),
+        milky_way_force=holder("current_global_impulse", 144_000_000),
+        local_group_trend=holder("current_global_trend", 6_000_000),
+        virgo_cluster_trend=holder("current_global_trend", 18_000_000),
+        andromeda_trend=holder("current_global_trend", 72_000_000),
+        universe_trend=holder("current_global_trend", 288_000_000),
+    )
+    return SimpleNamespace(
+        symbol=SYMBOL,
+        partial_phase_orchestrator=holder("current_phase", 120_000),
+        partial_impulse_orchestrator=holder("current_impulse", 300_000),
+        macd_cycle_orchestrator=holder("current_cycle", 600_000),
+        total_impulse_orchestrator=holder("current_impulse", 1_200_000),
+        total_trend_orchestrator=holder("current_trend", 2_400_000),
+        cosmic_hierarchy_orchestrator=cosmic,
+        ranking_metrics=SimpleNamespace(alignment_data=SimpleNamespace()),
+    )
+
+
+def run(ticks: int, with_context: bool, seed: int = 7) -> float:
+    """
+    Devuelve la latencia media por tick en microsegundos.
+    Sin contexto, el Context Modulator se desactiva por completo (pipeline de ponderación estática).
+    El flight recorder se apaga en ambos brazos: sus volcados no deben entrar en la medida
+    ni dejar ficheros en el directorio de trabajo.
+    """
+    rng = random.Random(seed)
+    manager = MetricsManager(build_app_config())
+    manager.flight_recorder.enabled = False
+    if not with_context:
+        manager.context_modulator = None
+    ps = build_position_state(rng)
+
+    # Velas pregeneradas para no medir el generador aleatorio
+    closes = {tf: 100.0 for tf in TIMEFRAMES}
+    bars = []
+    for _ in range(ticks if with_context else 0):
+        tick_bars = []
+        for tf in TIMEFRAMES:
+            close = closes[tf] = closes[tf] * (1 + rng.gauss(0, 0.002))
+            spread = close * abs(rng.gauss(0, 0.001))
+            tick_bars.append((tf, close + spread, close - spread, close, rng.uniform(500, 1500)))
+        bars.append(tick_bars)
+
+    start = time.perf_counter()
+    for tick in range(ticks):
+        if with_context:
+            for tf, high, low, close, volume in bars[tick]:
+                manager.update_market_context(SYMBOL, tf, high, low, close, volume)
+        manager.update_all_metrics(ps)
+    return (time.perf_counter() - start) / ticks * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    warmup_ticks = min(args.ticks, 200)
+    run(warmup_ticks, with_context=False), run(warmup_ticks, with_context=True)  # Calentamiento
+    # Mejor de N repeticiones, alternando brazos para que la deriva de la máquina afecte a ambos
+    baseline_runs, context_runs = [], []
+    for _ in range(args.repeat):
+        baseline_runs.append(run(args.ticks, with_context=False))
+        context_runs.append(run(args.ticks, with_context=True))
+    baseline_us, context_us = min(baseline_runs), min(context_runs)
+    overhead_pct = (context_us - baseline_us) / baseline_us * 100.0
+
+    print(f"Sin Context Modulator : {baseline_us:10.1f} µs/tick")
+    print(f"Con Context Modulator : {context_us:10.1f} µs/tick")
+    print(f"Sobrecoste            : {overhead_pct:+10.2f} % (objetivo < {MAX_OVERHEAD_PCT:.0f}%)")
+    return 0 if overhead_pct < MAX_OVERHEAD_PCT else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# BingXServices/benchmarks/bench_period_construction.py
+"""
+Benchmark de apertura/cierre de períodos: constructor validado de pydantic frente a la
+ruta de construcción rápida (`construct_trusted` + reciclado de métricas con `append_history`).
+
+Cada iteración abre un MacdCycleData, lo alimenta con unas velas, lo cierra y lo archiva
+en un historial con maxlen, igual que hace el orquestador de Nivel 3 en 1m.
+
+Uso:
+    python -m BingXServices.benchmarks.bench_period_construction [--periods 50000]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from collections import deque
+from decimal import Decimal
+
+from BingXServices.TradingService.data_models import (
+    MacdCycleData,
+    MetricsPool,
+    append_history,
+    construct_trusted,
+)
+
+BARS_PER_PERIOD = 5
+PRICE = Decimal("100.5")
+MACD = Decimal("0.01")
+
+
+def _feed_and_close(period: MacdCycleData, ts: int) -> None:
+    for k in range(BARS_PER_PERIOD):
+        period.timestamps.append(ts + k * 60_000)
+        period.price_history.append(PRICE)
+        period.macd_history.append(MACD)
+    period.metrics.price_velocity = MACD
+    period.active = False
+    period.exit_ts = ts + BARS_PER_PERIOD * 60_000
+    period.exit_price = PRICE
+
+
+def run_validated(n_periods: int) -> float:
+    history: deque = deque(maxlen=50)
+    start = time.perf_counter()
+    for i in range(n_periods):
+        ts = i * BARS_PER_PERIOD * 60_000 + 1
+        period = MacdCycleData(active=True, side="alcista", entry_ts=ts, entry_price=PRICE)
+        _feed_and_close(period, ts)
+        history.append(period)
+    return n_periods / (time.perf_counter() - start)
+
+
+def run_trusted(n_periods: int) -> float:
+    history: deque = deque(maxlen=50)
+    pool = MetricsPool()
+    start = time.perf_counter()
+    for i in range(n_periods):
+        ts = i * BARS_PER_PERIOD * 60_000 + 1
+        period = construct_trusted(MacdCycleData, pool, active=True, side="alcista", entry_ts=ts, entry_price=PRICE)
+        _feed_and_close(period, ts)
+        append_history(history, period, recycle=True, pool=pool)
+    return n_periods / (time.perf_counter() - start)
+
+
+def run_construction_only(n_periods: int, trusted: bool) -> float:
+    pool = MetricsPool()
+    start = time.perf_counter()
+    for i in range(n_periods):
+        if trusted:
+            construct_trusted(MacdCycleData, pool, active=True, side="alcista", entry_ts=i + 1, entry_price=PRICE)
+        else:
+            MacdCycleData(active=True, side="alcista", entry_ts=i + 1, entry_price=PRICE)
+    return n_periods / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--periods", type=int, default=50_000)
+    args = parser.parse_args()
+
+    run_validated(1000), run_trusted(1000)  # Calentamiento
+    validated = run_validated(args.periods)
+    trusted = run_trusted(args.periods)
+    build_validated = run_construction_only(args.periods, trusted=False)
+    build_trusted = run_construction_only(args.periods, trusted=True)
+
+    print("Apertura/cierre (construir, alimentar, cerrar, archivar):")
+    print(f"  Constructor validado : {validated:12,.0f} períodos/s")
+    print(f"  Ruta rápida + pool   : {trusted:12,.0f} períodos/s ({trusted / validated:.2f}x)")
+    print("Solo construcción:")
+    print(f"  Constructor validado : {build_validated:12,.0f} períodos/s")
+    print(f"  Ruta rápida + pool   : {build_trusted:12,.0f} períodos/s ({build_trusted / build_validated:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())